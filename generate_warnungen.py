@@ -2,6 +2,7 @@ import requests
 from icalendar import Calendar, Event
 from datetime import datetime, timedelta
 import pytz
+from wetter_archiv import archiv_schreiben, spalten_aus_open_meteo
 
 # Koordinaten Rubjerg Knude und Rebild Baker
 LOCATIONS = {
@@ -31,8 +32,10 @@ def fetch_weather(lat, lon):
     resp.raise_for_status()
     return resp.json()
 
-def sturmwarnung(daten):
-    morgen = (datetime.utcnow() + timedelta(days=1)).date()
+def sturmwarnung(daten, heute=None):
+    # heute kann für Rückrechnungen aus dem Archiv vorgegeben werden
+    heute = heute or datetime.utcnow().date()
+    morgen = heute + timedelta(days=1)
     hourly_time = daten["hourly"]["time"]
     hourly_wind = daten["hourly"]["windspeed_10m"]
 
@@ -44,8 +47,8 @@ def sturmwarnung(daten):
         return max_wind
     return None
 
-def regenwarnung(daten):
-    heute = datetime.utcnow().date()
+def regenwarnung(daten, heute=None):
+    heute = heute or datetime.utcnow().date()
     hourly_time = daten["hourly"]["time"]
     hourly_precip = daten["hourly"]["precipitation"]
 
@@ -93,6 +96,9 @@ def main():
         rubjerg_data = fetch_weather(**LOCATIONS["Rubjerg Knude"])
         rebild_data = fetch_weather(**LOCATIONS["Rebild Baker"])
 
+        archiv_schreiben("open-meteo", "Rubjerg Knude", spalten_aus_open_meteo(rubjerg_data))
+        archiv_schreiben("open-meteo", "Rebild Baker", spalten_aus_open_meteo(rebild_data))
+
         sturm = sturmwarnung(rubjerg_data)
         regen = regenwarnung(rebild_data)
 
@@ -9,6 +9,7 @@ from astral.location import Observer
 from icalendar import Calendar, Event
 from dotenv import load_dotenv
 from tide_cache import get_tides  # 🌊 Gezeitendaten werden benötigt
+from wetter_archiv import archiv_schreiben, spalten_aus_alerts
 
 # .env laden
 load_dotenv()
@@ -30,8 +31,8 @@ end_date = (datetime.now(tz) + timedelta(days=14)).date()
 
 
 # ---------------------- Wetterwarnungen ----------------------
-def get_extreme_alerts(lat, lon, api_key):
-    """Liefert extreme Wetterwarnungen (max. 7 Tage)"""
+def get_extreme_alerts(lat, lon, api_key, data=None):
+    """Liefert extreme Wetterwarnungen (max. 7 Tage); data z.B. für Rückrechnungen aus dem Archiv"""
     url = "https://api.openweathermap.org/data/3.0/onecall"
     params = {
         "lat": lat,
@@ -52,9 +53,11 @@ def get_extreme_alerts(lat, lon, api_key):
     extreme_keywords = keyword_map.keys()
 
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
+        if data is None:
+            response = requests.get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
+            archiv_schreiben("owm-alerts", "westerhever-pellworm", spalten_aus_alerts(data))
         alerts = data.get("alerts", [])
         extreme_alerts = []
 
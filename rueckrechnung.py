@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Rückrechnung: spielt archivierte Abrufe erneut durch die Erkennungsregeln,
+um Schwellen wie STURM_WIND_GRENZE an der Vergangenheit zu prüfen.
+
+Jeder Tag bzw. Abruf sieht dabei nur die Daten, die damals vorlagen.
+"""
+import time
+import importlib
+from datetime import datetime, timedelta
+
+import pytz
+
+import generate_warnungen
+import kalender_generator
+from wetter_archiv import (archiv_lesen, archiv_abrufe, open_meteo_aus_spalten, forecast_aus_spalten,
+                           alerts_aus_spalten)
+
+# Dateiname mit Bindestrich, daher kein normaler Import
+wetterereignisse = importlib.import_module("wetterereignisse-dk")
+
+
+def _tage(von, bis):
+    tag = von
+    while tag <= bis:
+        yield tag
+        tag += timedelta(days=1)
+
+
+def _abruf_am_tag(spalten, tag):
+    """True, wenn der jüngste Abruf in ``spalten`` an ``tag`` (UTC) erfolgte."""
+    return bool(spalten) and datetime.fromtimestamp(max(spalten["abgerufen"]), tz=pytz.utc).date() == tag
+
+
+def warnungen_rueckrechnen(von, bis):
+    """
+    Wertet sturmwarnung (Rubjerg Knude) und regenwarnung (Rebild Baker) für
+    jeden Tag von ``von`` bis ``bis`` (date) mit dem Datenstand am Ende dieses
+    Tages (UTC) aus. Liefert {tag: (sturm, regen_tage)}. Ein Ort zählt nur,
+    wenn er an diesem Tag abgerufen wurde (sonst keine Sturm- bzw. 0 Regentage);
+    Tage ganz ohne Abruf, z.B. nach einem ausgefallenen Workflow, fehlen.
+    """
+    ergebnisse = {}
+    for tag in _tage(von, bis):
+        stand = pytz.utc.localize(datetime.combine(tag + timedelta(days=1), datetime.min.time())) - timedelta(seconds=1)
+        # ts ist UTC, die Regeln rechnen in Ortszeit: einen Tag Puffer lesen
+        fenster = {"von": tag - timedelta(days=1), "bis": tag + timedelta(days=8), "stand": stand, "nur_neueste": True}
+        rubjerg = archiv_lesen("open-meteo", "Rubjerg Knude", **fenster)
+        rebild = archiv_lesen("open-meteo", "Rebild Baker", **fenster)
+        rubjerg = rubjerg if _abruf_am_tag(rubjerg, tag) else {}
+        rebild = rebild if _abruf_am_tag(rebild, tag) else {}
+        if not rubjerg and not rebild:
+            continue
+
+        sturm = generate_warnungen.sturmwarnung(open_meteo_aus_spalten(rubjerg), heute=tag) if rubjerg else None
+        regen = generate_warnungen.regenwarnung(open_meteo_aus_spalten(rebild), heute=tag) if rebild else 0
+        ergebnisse[tag] = (sturm, regen)
+    return ergebnisse
+
+
+def ereignisse_rueckrechnen(von=None, bis=None):
+    """
+    Führt detect_rain_series und detect_calm_morning für jeden archivierten
+    OpenWeatherMap-Abruf einzeln aus. Liefert je Erkennung eine Liste
+    (abgerufen als datetime, Ergebnis) für alle Abrufe mit Treffer.
+    """
+    regen = [
+        (datetime.fromtimestamp(abgerufen, tz=pytz.utc), treffer)
+        for abgerufen, spalten in archiv_abrufe("owm-forecast", "Rebild Baker", von, bis)
+        if (treffer := wetterereignisse.detect_rain_series(forecast_aus_spalten(spalten)))
+    ]
+    ruhe = [
+        (datetime.fromtimestamp(abgerufen, tz=pytz.utc), treffer)
+        for abgerufen, spalten in archiv_abrufe("owm-forecast", "Rubjerg Knude", von, bis)
+        if (treffer := wetterereignisse.detect_calm_morning(forecast_aus_spalten(spalten)))
+    ]
+    return {"regenserie": regen, "ruhiger_morgen": ruhe}
+
+
+def alerts_rueckrechnen(von=None, bis=None):
+    """
+    Führt get_extreme_alerts für jeden archivierten One-Call-Abruf der
+    Kalenderposition (Westerhever/Pellworm) aus. Liefert (abgerufen als
+    datetime, extreme Warnungen) für alle Abrufe, auch solche ohne Warnung.
+    """
+    lat, lon = kalender_generator.location.latitude, kalender_generator.location.longitude
+    return [
+        (datetime.fromtimestamp(abgerufen, tz=pytz.utc),
+         kalender_generator.get_extreme_alerts(lat, lon, None, data=alerts_aus_spalten(spalten)))
+        for abgerufen, spalten in archiv_abrufe("owm-alerts", "westerhever-pellworm", von, bis)
+    ]
+
+
+if __name__ == "__main__":
+    bis = datetime.now(pytz.utc).date()
+    von = bis - timedelta(days=365)
+
+    t0 = time.time()
+    warnungen = warnungen_rueckrechnen(von, bis)
+    sturmtage = [tag for tag, (sturm, _) in warnungen.items() if sturm]
+    regentage = [tag for tag, (_, regen) in warnungen.items() if regen >= 3]
+    print(f"ℹ️ {len(warnungen)} Tage mit Daten zwischen {von} und {bis}")
+    print(f"🌪️ Sturmwarnungen (≥ {generate_warnungen.STURM_WIND_GRENZE} km/h): {len(sturmtage)}")
+    print(f"🌧️ Regenwarnungen: {len(regentage)}")
+
+    ereignisse = ereignisse_rueckrechnen(von, bis + timedelta(days=1))
+    print(f"🌧️ Regenserien erkannt: {len(ereignisse['regenserie'])} Abrufe")
+    print(f"🌬️ Ruhige Morgen erkannt: {len(ereignisse['ruhiger_morgen'])} Abrufe")
+
+    alerts = alerts_rueckrechnen(von, bis + timedelta(days=1))
+    print(f"⚠️ Extremwarnungen: {sum(1 for _, a in alerts if a)} von {len(alerts)} Abrufen")
+    print(f"⏱️ Rückrechnung in {time.time() - t0:.1f} s")
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+import pytz
+
+import rueckrechnung
+import wetter_archiv as wa
+
+
+@pytest.fixture(autouse=True)
+def archiv(tmp_path, monkeypatch):
+    monkeypatch.setattr(wa, "ARCHIV_DIR", str(tmp_path / "archiv"))
+    return tmp_path / "archiv"
+
+
+def _utc(*args):
+    return pytz.utc.localize(datetime(*args))
+
+
+def _open_meteo(start, stunden, wind):
+    zeiten = [(start + timedelta(hours=h)).strftime("%Y-%m-%dT%H:%M") for h in range(stunden)]
+    return {"timezone": "UTC", "hourly": {
+        "time": zeiten,
+        "windspeed_10m": [wind(h) for h in range(stunden)],
+        "precipitation": [0.0] * stunden,
+    }}
+
+
+def test_roundtrip_ueber_monatsgrenze(archiv):
+    spalten = {"ts": [wa._zeitstempel(_utc(2025, 1, 31, 22) + timedelta(hours=h)) for h in range(4)],
+               "wind": [1, 2, 3, 4]}
+    assert wa.archiv_schreiben("test", "Ort A", spalten, abgerufen=100) == 4
+
+    assert sorted(os.listdir(archiv / "test" / "ort-a")) == ["2025-01", "2025-02"]
+    gelesen = wa.archiv_lesen("test", "Ort A")
+    assert gelesen["ts"] == spalten["ts"]
+    assert gelesen["wind"] == [1, 2, 3, 4]
+    assert gelesen["abgerufen"] == [100] * 4
+
+
+def test_bereich_filtert_dateien_und_zeilen():
+    for monat in (1, 2, 3):
+        ts = [wa._zeitstempel(_utc(2025, monat, tag)) for tag in range(1, 11)]
+        wa.archiv_schreiben("test", "ort", {"ts": ts, "tag": list(range(1, 11))}, abgerufen=monat)
+
+    gelesen = wa.archiv_lesen("test", "ort", von=date(2025, 2, 3), bis=_utc(2025, 2, 5, 12))
+    assert gelesen["tag"] == [3, 4, 5]
+    assert gelesen["abgerufen"] == [2, 2, 2]
+    assert wa.archiv_lesen("test", "ort", von=date(2025, 4, 1)) == {}
+
+
+def test_zeitangaben():
+    assert wa._zeitstempel(date(2025, 1, 1)) == wa._zeitstempel(_utc(2025, 1, 1))
+    with pytest.raises(ValueError):
+        wa.archiv_lesen("test", "ort", von=datetime(2025, 1, 1))
+
+
+def test_stand_und_nur_neueste():
+    import generate_warnungen
+
+    start = datetime(2025, 1, 31)
+    wa.archiv_schreiben("open-meteo", "ort", wa.spalten_aus_open_meteo(_open_meteo(start, 72, lambda h: 50)),
+                        abgerufen=_utc(2025, 1, 31, 5))
+    wa.archiv_schreiben("open-meteo", "ort", wa.spalten_aus_open_meteo(_open_meteo(start, 72, lambda h: 120)),
+                        abgerufen=_utc(2025, 2, 1, 5))
+
+    neueste = wa.archiv_lesen("open-meteo", "ort", nur_neueste=True)
+    assert set(neueste["windspeed_10m"]) == {120}
+
+    damals = wa.archiv_lesen("open-meteo", "ort", stand=_utc(2025, 1, 31, 23, 59), nur_neueste=True)
+    assert set(damals["windspeed_10m"]) == {50}
+    assert generate_warnungen.sturmwarnung(wa.open_meteo_aus_spalten(damals), heute=date(2025, 1, 31)) is None
+
+    alle = wa.archiv_lesen("open-meteo", "ort")
+    assert len(alle["ts"]) == 2 * 72
+
+
+def test_nur_gemeinsame_spalten():
+    ts = [wa._zeitstempel(_utc(2025, 3, 1, h)) for h in range(3)]
+    wa.archiv_schreiben("test", "ort", {"ts": ts, "wind": [1, 2, 3]}, abgerufen=1)
+    wa.archiv_schreiben("test", "ort", {"ts": ts, "wind": [4, 5, 6], "neu": [7, 8, 9]}, abgerufen=2)
+
+    gelesen = wa.archiv_lesen("test", "ort")
+    assert set(gelesen) == {"ts", "wind", "abgerufen"}
+    assert None not in gelesen["wind"]
+
+
+def test_abgeschlossene_monate_werden_verdichtet(archiv):
+    for abruf in range(5):
+        ts = [wa._zeitstempel(_utc(2025, 5, 1 + abruf, h)) for h in range(24)]
+        wa.archiv_schreiben("test", "ort", {"ts": ts, "wert": [abruf] * 24}, abgerufen=1000 + abruf)
+    assert len(os.listdir(archiv / "test" / "ort" / "2025-05")) == 5
+
+    # Der nächste Abruf, der den Monat nicht mehr berührt, verdichtet ihn
+    wa.archiv_schreiben("test", "ort", {"ts": [wa._zeitstempel(_utc(2025, 6, 1))], "wert": [9]}, abgerufen=2000)
+    assert len(os.listdir(archiv / "test" / "ort" / "2025-05")) == 1
+    gelesen = wa.archiv_lesen("test", "ort", stand=1002)
+    assert gelesen["wert"] == [0] * 24 + [1] * 24 + [2] * 24
+
+    abrufe = list(wa.archiv_abrufe("test", "ort", bis=1999))
+    assert [abgerufen for abgerufen, _ in abrufe] == [1000 + i for i in range(5)]
+    assert abrufe[3][1]["wert"] == [3] * 24
+
+
+def test_abrufe_einzeln_fuer_erkennung():
+    wetterereignisse = rueckrechnung.wetterereignisse
+    # Sturmtag, danach ruhiger Sonnenaufgang – in zwei getrennten Abrufen
+    for abruf, tag in enumerate((date(2025, 3, 1), date(2025, 3, 10))):
+        basis = wa._zeitstempel(tag)
+        eintraege = [{"dt": basis + i * 10800, "wind": {"speed": 15 if i < 8 else 1}} for i in range(16)]
+        wa.archiv_schreiben("owm-forecast", "Rubjerg Knude", wa.spalten_aus_forecast({"list": eintraege}),
+                            abgerufen=basis + abruf)
+
+    treffer = [wetterereignisse.detect_calm_morning(wa.forecast_aus_spalten(spalten))
+               for _, spalten in wa.archiv_abrufe("owm-forecast", "Rubjerg Knude")]
+    assert [t[1] for t in treffer] == [date(2025, 3, 2), date(2025, 3, 11)]
+
+
+def test_open_meteo_zeitumstellung():
+    # Herbst 2025: 02:00 Ortszeit kommt zweimal vor
+    zeiten = ["2025-10-26T00:00", "2025-10-26T01:00", "2025-10-26T02:00", "2025-10-26T02:00", "2025-10-26T03:00"]
+    daten = {"timezone": "Europe/Copenhagen", "hourly": {"time": zeiten, "windspeed_10m": [1, 2, 3, 4, 5]}}
+
+    ts = wa.spalten_aus_open_meteo(daten)["ts"]
+    assert ts == [1761429600 + i * 3600 for i in range(5)]
+    assert 1761436800 in ts
+
+
+def test_forecast_vollstaendig():
+    eintrag = {
+        "dt": 1740787200,
+        "main": {"temp": 4.2, "feels_like": 0.1, "humidity": 80},
+        "weather": [{"id": 500, "main": "Rain", "description": "light rain"}],
+        "clouds": {"all": 90},
+        "wind": {"speed": 12.5, "deg": 270, "gust": 20.1},
+        "visibility": 10000,
+        "pop": 0.8,
+        "rain": {"3h": 1.5},
+        "sys": {"pod": "d"},
+        "dt_txt": "2025-03-01 00:00:00",
+    }
+    trocken = {"dt": 1740798000, "main": {"temp": 5.0}, "wind": {"speed": 3}}
+    wa.archiv_schreiben("owm-forecast", "ort", wa.spalten_aus_forecast({"list": [eintrag, trocken]}), abgerufen=1)
+
+    gelesen = wa.forecast_aus_spalten(wa.archiv_lesen("owm-forecast", "ort"))["list"]
+    assert gelesen[0] == eintrag
+    assert gelesen[1] == trocken
+
+
+def test_alerts_jeder_abruf_bleibt_erhalten():
+    wa.archiv_schreiben("owm-alerts", "ort", wa.spalten_aus_alerts({}), abgerufen=1740787200)
+    alert = {"event": "Gale warning", "description": "Storm and gale", "end": 1740900000}
+    wa.archiv_schreiben("owm-alerts", "ort", wa.spalten_aus_alerts({"alerts": [alert]}), abgerufen=1740873600)
+
+    abrufe = list(wa.archiv_abrufe("owm-alerts", "ort"))
+    assert [abgerufen for abgerufen, _ in abrufe] == [1740787200, 1740873600]
+    assert wa.alerts_aus_spalten(abrufe[0][1]) == {"alerts": []}
+    assert wa.alerts_aus_spalten(abrufe[1][1])["alerts"][0]["event"] == "Gale warning"
+
+
+def test_alerts_rueckrechnen():
+    basis = wa._zeitstempel(date(2025, 2, 1))
+    wa.archiv_schreiben("owm-alerts", "westerhever-pellworm", wa.spalten_aus_alerts({}), abgerufen=basis)
+    alert = {"event": "Storm surge", "description": "Sturmflut", "start": basis + 86400, "end": basis + 2 * 86400}
+    wa.archiv_schreiben("owm-alerts", "westerhever-pellworm", wa.spalten_aus_alerts({"alerts": [alert]}),
+                        abgerufen=basis + 3600)
+
+    ergebnis = rueckrechnung.alerts_rueckrechnen()
+    assert [len(extrem) for _, extrem in ergebnis] == [0, 1]
+    assert ergebnis[1][1][0]["title"] == "Sturm"
+
+
+def test_tage_ohne_abruf_fehlen():
+    for tag in (1, 2, 4):
+        lauf = datetime(2025, 3, tag)
+        for ort in ("Rubjerg Knude", "Rebild Baker"):
+            wa.archiv_schreiben("open-meteo", ort, wa.spalten_aus_open_meteo(_open_meteo(lauf, 168, lambda h: 10)),
+                                abgerufen=pytz.utc.localize(lauf + timedelta(hours=5)))
+
+    ergebnisse = rueckrechnung.warnungen_rueckrechnen(date(2025, 3, 1), date(2025, 3, 4))
+    assert sorted(ergebnisse) == [date(2025, 3, 1), date(2025, 3, 2), date(2025, 3, 4)]
+
+
+def test_jahr_oeffnet_jeden_chunk_hoechstens_einmal(archiv):
+    # Laufzeit misst ``python rueckrechnung.py``; hier nur, dass kein Chunk mehrfach dekodiert wird
+    random.seed(1)
+    start = datetime(2025, 1, 1)
+    for tag in range(365):
+        lauf = start + timedelta(days=tag)
+        for ort in ("Rubjerg Knude", "Rebild Baker"):
+            daten = _open_meteo(lauf, 168, lambda h: random.uniform(0, 120))
+            wa.archiv_schreiben("open-meteo", ort, wa.spalten_aus_open_meteo(daten),
+                                abgerufen=pytz.utc.localize(lauf + timedelta(hours=5)))
+    chunks = sum(len(dateien) for _, _, dateien in os.walk(archiv / "open-meteo"))
+
+    wa._chunk_laden_gecacht.cache_clear()
+    jahr = wa.archiv_lesen("open-meteo", "Rubjerg Knude", von=date(2025, 1, 1), bis=date(2025, 12, 31))
+    assert len(jahr["ts"]) > 365 * 24
+    assert wa._chunk_laden_gecacht.cache_info().misses <= chunks / 2
+
+    wa._chunk_laden_gecacht.cache_clear()
+    ergebnisse = rueckrechnung.warnungen_rueckrechnen(date(2025, 1, 1), date(2025, 12, 31))
+    assert len(ergebnisse) == 365
+    assert wa._chunk_laden_gecacht.cache_info().misses <= chunks
@@ -3,6 +3,7 @@ import json
 import requests
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from wetter_archiv import archiv_schreiben, spalten_aus_gezeiten
 
 load_dotenv()
 
@@ -52,6 +53,8 @@ def get_tides():
         with open(CACHE_FILE, "w") as f:
             json.dump(data, f)
 
+        archiv_schreiben("worldtides", "westerhever", spalten_aus_gezeiten(data))
+
         return data
     except requests.RequestException as e:
         print(f"❌ Fehler bei API-Abfrage: {e}")
@@ -13,8 +13,9 @@ def get_weather_data_onecall(lat, lon, api_key):
     resp.raise_for_status()
     return resp.json()
 
-def check_sturmflut(lat, lon, api_key):
-    data = get_weather_data_onecall(lat, lon, api_key)
+def check_sturmflut(lat, lon, api_key, data=None):
+    if data is None:
+        data = get_weather_data_onecall(lat, lon, api_key)
 
     warning_msgs = []
 
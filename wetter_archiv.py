@@ -0,0 +1,386 @@
+# -*- coding: utf-8 -*-
+"""
+Append-only Archiv für Vorhersagen und Warnungen.
+
+Jeder Abruf wird spaltenweise (eine Liste pro Feld) als gzip-komprimierter
+Chunk abgelegt, partitioniert nach Quelle, Ort und Monat:
+
+    archiv/<quelle>/<ort>/<JJJJ-MM>/<von>_<bis>_<abgerufen>.json.gz
+
+Der Dateiname ist zugleich der Zeitindex: ``von``/``bis`` sind die Grenzen
+der Spalte ``ts`` (Unix-Sekunden, UTC), ``abgerufen`` der Abrufzeitpunkt, so
+dass bei Abfragen nur passende Chunks geöffnet werden. Laufende Monate werden
+nur ergänzt; abgeschlossene Monate werden zu einem Chunk ``<von>_<bis>_<erster
+Abruf>-<letzter Abruf>.json.gz`` zusammengefasst.
+
+Das Archiv liegt im Repository und wird von den Workflows mitcommittet. Die
+Einzeldateien eines Monats bleiben daher in der Git-Historie erhalten, der
+aktuelle Stand enthält aber je Monat nur eine Datei.
+"""
+import os
+import gzip
+import json
+import bisect
+import calendar
+from functools import lru_cache
+from datetime import date, datetime
+
+import pytz
+
+ARCHIV_DIR = os.getenv("FOTOZEITEN_ARCHIV", "archiv")
+
+
+def _ort_schluessel(ort):
+    return ort.strip().lower().replace(" ", "-")
+
+
+def _zeitstempel(wert):
+    """
+    Wandelt einen Zeitpunkt in Unix-Sekunden (UTC) um. Erlaubt sind Zahlen,
+    datetime mit Zeitzone und date (Tagesbeginn in UTC).
+    """
+    if wert is None:
+        return None
+    if isinstance(wert, datetime):
+        if wert.utcoffset() is None:
+            raise ValueError(f"datetime ohne Zeitzone ist nicht eindeutig: {wert}")
+        return calendar.timegm(wert.utctimetuple())
+    if isinstance(wert, date):
+        return calendar.timegm(wert.timetuple())
+    return int(wert)
+
+
+def _monat(ts):
+    return datetime.utcfromtimestamp(ts).strftime("%Y-%m")
+
+
+def _chunk_dateien(ordner):
+    """Liefert (pfad, ts_von, ts_bis, abgerufen_von, abgerufen_bis) je Chunk."""
+    for datei in sorted(os.listdir(ordner)):
+        if not datei.endswith(".json.gz"):
+            continue
+        teile = datei[:-len(".json.gz")].split("_")
+        abgerufen_von, _, abgerufen_bis = teile[2].partition("-")
+        yield (os.path.join(ordner, datei), int(teile[0]), int(teile[1]),
+               int(abgerufen_von), int(abgerufen_bis or abgerufen_von))
+
+
+def _chunk_laden(pfad):
+    return _chunk_laden_gecacht(pfad, os.stat(pfad).st_mtime_ns)
+
+
+@lru_cache(maxsize=64)
+def _chunk_laden_gecacht(pfad, mtime):
+    # Rückrechnungen lesen denselben Monat für viele Tage; Ergebnis nicht verändern
+    with gzip.open(pfad, "rt", encoding="utf-8") as f:
+        chunk = json.load(f)
+    spalten = chunk["spalten"]
+    # Einzelabrufe speichern den Abrufzeitpunkt nur einmal, verdichtete Chunks als Spalte
+    if "abgerufen" not in spalten:
+        spalten["abgerufen"] = [chunk["abgerufen"]] * len(spalten["ts"])
+    return spalten
+
+
+def _chunk_speichern(ordner, name, inhalt):
+    pfad = os.path.join(ordner, f"{name}.json.gz")
+    nr = 1
+    while os.path.exists(pfad):
+        pfad = os.path.join(ordner, f"{name}_{nr}.json.gz")
+        nr += 1
+
+    tmp = pfad + ".tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump(inhalt, f, separators=(",", ":"))
+    os.replace(tmp, pfad)
+    return pfad
+
+
+def _zusammenfuehren(teile):
+    """Hängt Spalten-Dicts aneinander; behalten werden nur gemeinsame Spalten."""
+    namen = [n for n in teile[0] if all(n in teil for teil in teile)]
+    ergebnis = {name: [] for name in namen}
+    for teil in teile:
+        for name in namen:
+            ergebnis[name].extend(teil[name])
+    reihenfolge = sorted(range(len(ergebnis["ts"])), key=lambda i: (ergebnis["ts"][i], ergebnis["abgerufen"][i]))
+    return {name: [werte[i] for i in reihenfolge] for name, werte in ergebnis.items()}
+
+
+def archiv_schreiben(quelle, ort, spalten, abgerufen=None):
+    """
+    Hängt einen Abruf an das Archiv an. ``spalten`` ist ein Dict gleich langer
+    Listen und muss die Spalte ``ts`` enthalten; Zeilen mit ``ts`` None werden
+    beim Abrufzeitpunkt einsortiert. Fehler werden nur gemeldet,
+    damit ein Archivproblem nie die Kalendererstellung abbricht.
+    Gibt die Anzahl geschriebener Zeilen zurück.
+    """
+    try:
+        ts = spalten.get("ts", [])
+        if not ts:
+            return 0
+        if any(len(werte) != len(ts) for werte in spalten.values()):
+            raise ValueError("Spalten haben unterschiedliche Länge")
+
+        abgerufen = _zeitstempel(abgerufen) or calendar.timegm(datetime.utcnow().utctimetuple())
+        if None in ts:
+            ts = [abgerufen if t is None else t for t in ts]
+            spalten = dict(spalten, ts=ts)
+        reihenfolge = sorted(range(len(ts)), key=ts.__getitem__)
+
+        # Zeilen nach Monat aufteilen, innerhalb eines Chunks nach ts sortiert
+        nach_monat = {}
+        for i in reihenfolge:
+            nach_monat.setdefault(_monat(ts[i]), []).append(i)
+
+        basis = os.path.join(ARCHIV_DIR, quelle, _ort_schluessel(ort))
+        for monat, zeilen in nach_monat.items():
+            chunk = {name: [werte[i] for i in zeilen] for name, werte in spalten.items()}
+            ordner = os.path.join(basis, monat)
+            os.makedirs(ordner, exist_ok=True)
+            name = f"{chunk['ts'][0]}_{chunk['ts'][-1]}_{abgerufen}"
+            _chunk_speichern(ordner, name, {"abgerufen": abgerufen, "spalten": chunk})
+
+        # Abgeschlossene Monate zu einem Chunk zusammenfassen; gerade beschriebene
+        # Monate erst beim nächsten Lauf, damit nicht jeder Abruf neu verdichtet
+        aktueller_monat = datetime.utcnow().strftime("%Y-%m")
+        for monat in os.listdir(basis):
+            if monat < aktueller_monat and monat not in nach_monat:
+                archiv_verdichten(quelle, ort, monat)
+
+        return len(ts)
+    except Exception as e:
+        print(f"⚠️ Fehler beim Archivieren ({quelle}/{ort}): {e}")
+        return 0
+
+
+def archiv_verdichten(quelle, ort, monat):
+    """
+    Fasst alle Chunks eines Monats zu einem Chunk zusammen (je Spaltensatz,
+    falls sich die abgerufenen Felder geändert haben). Gedacht für
+    abgeschlossene Monate; gibt die Anzahl zusammengefasster Dateien zurück.
+    """
+    ordner = os.path.join(ARCHIV_DIR, quelle, _ort_schluessel(ort), monat)
+    if not os.path.isdir(ordner):
+        return 0
+    dateien = [pfad for pfad, *_ in _chunk_dateien(ordner)]
+    if len(dateien) < 2:
+        return 0
+
+    gruppen = {}
+    for pfad in dateien:
+        spalten = _chunk_laden(pfad)
+        gruppen.setdefault(tuple(sorted(spalten)), []).append((pfad, spalten))
+
+    verdichtet = 0
+    for eintraege in gruppen.values():
+        if len(eintraege) < 2:
+            continue
+        chunk = _zusammenfuehren([spalten for _, spalten in eintraege])
+        name = f"{chunk['ts'][0]}_{chunk['ts'][-1]}_{min(chunk['abgerufen'])}-{max(chunk['abgerufen'])}"
+        _chunk_speichern(ordner, name, {"spalten": chunk})
+        for pfad, _ in eintraege:
+            os.remove(pfad)
+        verdichtet += len(eintraege)
+    return verdichtet
+
+
+def archiv_lesen(quelle, ort, von=None, bis=None, stand=None, nur_neueste=False):
+    """
+    Liefert alle archivierten Zeilen mit ``von <= ts <= bis`` als Dict von
+    Spalten, sortiert nach ``ts`` und ergänzt um die Spalte ``abgerufen``.
+    Mit ``stand`` werden nur Abrufe bis zu diesem Zeitpunkt berücksichtigt.
+    Mit ``nur_neueste=True`` bleibt je Zeitpunkt nur der jüngste (berücksichtigte)
+    Abruf übrig; zusammen mit ``stand`` ist das der Datenstand, den ein Lauf
+    zu diesem Zeitpunkt gesehen hätte.
+    Zeitangaben siehe ``_zeitstempel``; enthalten Chunks unterschiedliche
+    Felder, werden nur die gemeinsamen zurückgegeben.
+    """
+    von = _zeitstempel(von)
+    bis = _zeitstempel(bis)
+    stand = _zeitstempel(stand)
+    basis = os.path.join(ARCHIV_DIR, quelle, _ort_schluessel(ort))
+    if not os.path.isdir(basis):
+        return {}
+
+    erster_monat = _monat(von) if von is not None else None
+    letzter_monat = _monat(bis) if bis is not None else None
+
+    teile = []
+    for monat in sorted(os.listdir(basis)):
+        if erster_monat and monat < erster_monat or letzter_monat and monat > letzter_monat:
+            continue
+        for pfad, ts_von, ts_bis, abgerufen_von, _ in _chunk_dateien(os.path.join(basis, monat)):
+            if von is not None and ts_bis < von or bis is not None and ts_von > bis:
+                continue
+            if stand is not None and abgerufen_von > stand:
+                continue
+
+            spalten = _chunk_laden(pfad)
+            ts = spalten["ts"]
+            a = bisect.bisect_left(ts, von) if von is not None else 0
+            b = bisect.bisect_right(ts, bis) if bis is not None else len(ts)
+            zeilen = range(a, b)
+            if stand is not None:
+                zeilen = [i for i in zeilen if spalten["abgerufen"][i] <= stand]
+            if zeilen:
+                teile.append({name: [werte[i] for i in zeilen] for name, werte in spalten.items()})
+
+    if not teile:
+        return {}
+    ergebnis = _zusammenfuehren(teile)
+
+    if nur_neueste:
+        neuester = {}
+        for ts, abgerufen in zip(ergebnis["ts"], ergebnis["abgerufen"]):
+            neuester[ts] = max(neuester.get(ts, abgerufen), abgerufen)
+        behalten = [i for i, ts in enumerate(ergebnis["ts"]) if ergebnis["abgerufen"][i] == neuester[ts]]
+        ergebnis = {name: [werte[i] for i in behalten] for name, werte in ergebnis.items()}
+
+    return ergebnis
+
+
+def archiv_abrufe(quelle, ort, von=None, bis=None):
+    """
+    Liefert die archivierten Abrufe mit ``von <= abgerufen <= bis`` einzeln,
+    als (abgerufen, spalten) in zeitlicher Reihenfolge. Geeignet für
+    Erkennungsregeln, die genau eine Vorhersage erwarten.
+    """
+    von = _zeitstempel(von)
+    bis = _zeitstempel(bis)
+    basis = os.path.join(ARCHIV_DIR, quelle, _ort_schluessel(ort))
+    if not os.path.isdir(basis):
+        return
+
+    nach_abruf = {}
+    for monat in sorted(os.listdir(basis)):
+        for pfad, _, _, abgerufen_von, abgerufen_bis in _chunk_dateien(os.path.join(basis, monat)):
+            if von is not None and abgerufen_bis < von or bis is not None and abgerufen_von > bis:
+                continue
+            spalten = _chunk_laden(pfad)
+            zeilen_je_abruf = {}
+            for i, abgerufen in enumerate(spalten["abgerufen"]):
+                if (von is None or abgerufen >= von) and (bis is None or abgerufen <= bis):
+                    zeilen_je_abruf.setdefault(abgerufen, []).append(i)
+            for abgerufen, zeilen in zeilen_je_abruf.items():
+                teil = {name: [werte[i] for i in zeilen] for name, werte in spalten.items()}
+                nach_abruf.setdefault(abgerufen, []).append(teil)
+
+    for abgerufen in sorted(nach_abruf):
+        yield abgerufen, _zusammenfuehren(nach_abruf[abgerufen])
+
+
+# ---------------------- Umwandlung der API-Antworten ----------------------
+def spalten_aus_open_meteo(daten):
+    """
+    Open-Meteo ``hourly``-Block -> Spalten. Die Zeiten sind Ortszeit laut
+    ``timezone`` und lückenlos stündlich; ``ts`` wird daher vom ersten Wert aus
+    hochgezählt, damit die doppelte Stunde bei der Zeitumstellung eindeutig bleibt.
+    """
+    hourly = daten.get("hourly", {})
+    zeiten = hourly.get("time", [])
+    spalten = dict(hourly)
+    if zeiten:
+        zone = pytz.timezone(daten.get("timezone", "UTC"))
+        erster = _zeitstempel(zone.localize(datetime.fromisoformat(zeiten[0])))
+        spalten["ts"] = [erster + i * 3600 for i in range(len(zeiten))]
+    else:
+        spalten["ts"] = []
+    return spalten
+
+
+def open_meteo_aus_spalten(spalten, timezone="Europe/Copenhagen"):
+    """Spalten -> Struktur wie von ``fetch_weather`` geliefert."""
+    hourly = {name: werte for name, werte in spalten.items() if name not in ("ts", "abgerufen")}
+    return {"timezone": timezone, "hourly": hourly}
+
+
+# Verschachtelte Felder eines /2.5/forecast-Eintrags; "weather" ist eine Liste mit einem Element
+_FORECAST_GRUPPEN = ("main", "weather", "clouds", "wind", "rain", "snow", "sys")
+# Immer angelegt, damit Abrufe ohne Regen/Schnee/Böen dieselben Spalten haben
+_FORECAST_SPALTEN = ("wind_speed", "wind_deg", "wind_gust", "rain_3h", "snow_3h", "clouds_all", "main_temp")
+
+
+def spalten_aus_forecast(data):
+    """OpenWeatherMap ``/2.5/forecast`` -> Spalten, verschachtelte Felder als ``gruppe_feld``."""
+    zeilen = []
+    for eintrag in data.get("list", []):
+        zeile = {}
+        for schluessel, wert in eintrag.items():
+            if schluessel == "weather":
+                wert = wert[0] if wert else {}
+            if schluessel in _FORECAST_GRUPPEN and isinstance(wert, dict):
+                for feld, feldwert in wert.items():
+                    zeile[f"{schluessel}_{feld}"] = feldwert
+            else:
+                zeile[schluessel] = wert
+        zeilen.append(zeile)
+
+    namen = list(_FORECAST_SPALTEN)
+    for zeile in zeilen:
+        namen.extend(n for n in zeile if n not in namen and n != "dt")
+    spalten = {name: [zeile.get(name) for zeile in zeilen] for name in namen}
+    spalten["ts"] = [zeile["dt"] for zeile in zeilen]
+    return spalten
+
+
+def forecast_aus_spalten(spalten):
+    """Spalten -> ``/2.5/forecast``-Struktur; fehlende Werte werden weggelassen."""
+    namen = [n for n in spalten if n not in ("ts", "abgerufen")]
+    liste = []
+    for i, ts in enumerate(spalten.get("ts", [])):
+        eintrag = {"dt": ts}
+        for name in namen:
+            wert = spalten[name][i]
+            if wert is None:
+                continue
+            gruppe, _, feld = name.partition("_")
+            if gruppe in _FORECAST_GRUPPEN and feld:
+                eintrag.setdefault(gruppe, {})[feld] = wert
+            else:
+                eintrag[name] = wert
+        if "weather" in eintrag:
+            eintrag["weather"] = [eintrag["weather"]]
+        liste.append(eintrag)
+    return {"list": liste}
+
+
+def spalten_aus_alerts(data):
+    """
+    One Call ``alerts`` -> Spalten, indiziert nach Warnungsbeginn. Warnungen
+    ohne Beginn und ein Abruf ohne Warnungen erhalten kein ``ts`` und landen
+    beim Abrufzeitpunkt; ohne Warnungen wird eine Markerzeile (``alert`` =
+    False) geschrieben, damit "abgerufen, keine Warnung" erkennbar bleibt.
+    """
+    alerts = data.get("alerts", [])
+    if not alerts:
+        return {"ts": [None], "alert": [False], "start": [None], "end": [None],
+                "event": [None], "description": [None], "sender_name": [None]}
+    return {
+        "ts": [a.get("start") for a in alerts],
+        "alert": [True] * len(alerts),
+        "start": [a.get("start") for a in alerts],
+        "end": [a.get("end") for a in alerts],
+        "event": [a.get("event", "") for a in alerts],
+        "description": [a.get("description", "") for a in alerts],
+        "sender_name": [a.get("sender_name", "") for a in alerts],
+    }
+
+
+def alerts_aus_spalten(spalten):
+    """Spalten -> One-Call-Struktur; Markerzeilen werden übersprungen."""
+    felder = ("start", "end", "event", "description", "sender_name")
+    return {"alerts": [
+        {feld: spalten[feld][i] for feld in felder if feld in spalten and spalten[feld][i] is not None}
+        for i, alert in enumerate(spalten.get("alert", []))
+        if alert
+    ]}
+
+
+def spalten_aus_gezeiten(data):
+    """WorldTides ``extremes`` -> Spalten."""
+    extremes = data.get("extremes", [])
+    return {
+        "ts": [e["dt"] for e in extremes],
+        "type": [e.get("type") for e in extremes],
+        "height": [e.get("height") for e in extremes],
+    }
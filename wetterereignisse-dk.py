@@ -7,6 +7,7 @@ from icalendar import Calendar, Event
 from dotenv import load_dotenv
 from astral import LocationInfo
 from astral.sun import sun
+from wetter_archiv import archiv_schreiben, spalten_aus_alerts, spalten_aus_forecast
 
 # .env laden
 load_dotenv()
@@ -41,6 +42,7 @@ def get_weather_alerts():
         response = requests.get(url, params=params)
         response.raise_for_status()
         data = response.json()
+        archiv_schreiben("owm-alerts", "Rubjerg Knude", spalten_aus_alerts(data))
         alerts = data.get("alerts", [])
         return [
             f"{alert.get('event', 'Warnung')}: {alert.get('description', '')}"
@@ -51,8 +53,10 @@ def get_weather_alerts():
         return []
 
 # Regenanalyse: 3+ Tage in Folge mit mindestens 2 Regen-Zeitblöcken pro Tag
+# (für Rückrechnungen kann data übergeben werden, aber immer nur ein einzelner
+# Abruf, siehe wetter_archiv.archiv_abrufe und rueckrechnung.py)
 
-def detect_rain_series():
+def detect_rain_series(data=None):
     url = "https://api.openweathermap.org/data/2.5/forecast"
     params = {
         "lat": lat_rebild,
@@ -61,9 +65,11 @@ def detect_rain_series():
         "units": "metric"
     }
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
+        if data is None:
+            response = requests.get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
+            archiv_schreiben("owm-forecast", "Rebild Baker", spalten_aus_forecast(data))
 
         rain_counts = {}
 
@@ -95,8 +101,9 @@ def detect_rain_series():
         return None
 
 # Ruhiger Morgen nach Sturm erkennen (Rubjerg Knude)
+# (data wie bei detect_rain_series: genau ein Abruf)
 
-def detect_calm_morning():
+def detect_calm_morning(data=None):
     url = "https://api.openweathermap.org/data/2.5/forecast"
     params = {
         "lat": lat_rubjerg,
@@ -105,9 +112,11 @@ def detect_calm_morning():
         "units": "metric"
     }
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
+        if data is None:
+            response = requests.get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
+            archiv_schreiben("owm-forecast", "Rubjerg Knude", spalten_aus_forecast(data))
 
         wind_speed_by_day = {}
         for entry in data["list"]:
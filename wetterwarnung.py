@@ -5,7 +5,8 @@ from datetime import datetime, timedelta
 from pytz import timezone
 from icalendar import Calendar, Event
 
-from weather_alerts import check_sturmflut
+from weather_alerts import check_sturmflut, get_weather_data_onecall
+from wetter_archiv import archiv_schreiben, spalten_aus_alerts
 
 # Standort: Westerhever, Deutschland
 LAT = 54.375  # Breitengrad
@@ -41,7 +42,10 @@ if __name__ == "__main__":
     if not api_key:
         raise ValueError("OPENWEATHERMAP_API_KEY nicht gesetzt!")
 
-    warnung = check_sturmflut(LAT, LON, api_key)
+    data = get_weather_data_onecall(LAT, LON, api_key)
+    archiv_schreiben("owm-alerts", "westerhever", spalten_aus_alerts(data))
+
+    warnung = check_sturmflut(LAT, LON, api_key, data=data)
     if warnung:
         print("✅ Wetterwarnung erkannt, schreibe ICS-Datei.")
         schreibe_warnung_ins_ics(warnung, OUTPUT_FILE)